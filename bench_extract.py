@@ -0,0 +1,85 @@
+"""Microbenchmark for extract_data(): line-by-line text scanning vs chunked bytes scanning.
+
+Usage:
+    python3 bench_extract.py                  # synthetic wayback-style dump of 500k URLs
+    python3 bench_extract.py --lines 2000000
+    python3 bench_extract.py --file output/example_com/wayback_output.txt
+
+Both paths run on the same file and must return the same results.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import importlib.util
+
+def load_wlmaker():
+    """Import wlmaker-v02.py, whose file name is not a valid module name."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wlmaker-v02.py")
+    spec = importlib.util.spec_from_file_location("wlmaker", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def generate_dump(filename, lines, seed=1):
+    """Write a synthetic archive dump with a small share of messy lines."""
+    rng = random.Random(seed)
+    hosts = [f"{name}.example.com" for name in ("www", "api", "cdn", "shop", "m")] + ["example.com"]
+    segments = ["api", "v1", "v2", "static", "assets", "img", "user", "account", "graphql", "search", "blog", "2019"]
+    params = ["id", "q", "page", "sort", "utm_source", "ref", "token", "lang", "a%5Bb%5D", "x+y"]
+    extensions = ["", "", "", ".js", ".css", ".png", ".php", ".html", ".json"]
+    with open(filename, 'wb') as f:
+        for i in range(lines):
+            path = '/'.join(rng.choice(segments) for _ in range(rng.randrange(0, 5)))
+            url = f"{rng.choice(('http', 'https'))}://{rng.choice(hosts)}/{path}{rng.choice(extensions)}"
+            if rng.random() < 0.5:
+                url += '?' + '&'.join(f"{rng.choice(params)}={rng.randrange(1000)}" for _ in range(rng.randrange(1, 4)))
+            if rng.random() < 0.05:
+                url += f"#section-{rng.randrange(20)}"
+            line = url.encode('ascii')
+            if rng.random() < 0.01:
+                line = line.replace(b'/', rng.choice((b'/\xc3\xa9', b'/\xff', b'/\r')), 1)
+            f.write(line + b'\n')
+
+def run(extract_data, filename, fast, repeat):
+    """Return the best wall time of extract_data over repeat runs, and its result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extract_data(filename, fast=fast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the text and bytes paths of extract_data().')
+    parser.add_argument('--file', help='URL dump to scan instead of a synthetic one')
+    parser.add_argument('--lines', type=int, default=500000, help='Lines in the synthetic dump (default: 500000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path, best time is reported (default: 3)')
+    args = parser.parse_args()
+
+    wlmaker = load_wlmaker()
+    with tempfile.TemporaryDirectory() as work_dir:
+        filename = args.file
+        if not filename:
+            filename = os.path.join(work_dir, "dump.txt")
+            generate_dump(filename, args.lines)
+        size_mb = os.path.getsize(filename) / (1 << 20)
+
+        text_time, text_result = run(wlmaker.extract_data, filename, False, args.repeat)
+        bytes_time, bytes_result = run(wlmaker.extract_data, filename, True, args.repeat)
+
+    if text_result != bytes_result:
+        print("Results differ between the text and bytes paths")
+        return 1
+
+    print(f"File: {size_mb:.1f} MB")
+    print(f"Text path:  {text_time:.2f}s ({size_mb / text_time:.1f} MB/s)")
+    print(f"Bytes path: {bytes_time:.2f}s ({size_mb / bytes_time:.1f} MB/s)")
+    print(f"Speedup: {text_time / bytes_time:.1f}x, identical results")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
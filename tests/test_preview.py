@@ -0,0 +1,64 @@
+"""Checks for preview sampling and full-run estimates."""
+import os
+import random
+import importlib.util
+
+import pytest
+
+def load_wlmaker():
+    """Import wlmaker-v02.py, whose file name is not a valid module name."""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wlmaker-v02.py")
+    spec = importlib.util.spec_from_file_location("wlmaker", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+wlmaker = load_wlmaker()
+
+@pytest.mark.parametrize("observed,singletons,doubletons,sampled,total", [
+    (500, 500, 0, 500, 20006),          # every sampled path seen once
+    (20000, 20000, 0, 20000, 51234567),
+    (159, 90, 20, 500, 20006),
+    (10, 5, 0, 10, 12),
+    (3, 1, 1, 2, 1000),
+])
+def test_estimate_stays_within_bounds(observed, singletons, doubletons, sampled, total):
+    for cap in (None, total):
+        estimate, low, high = wlmaker.estimate_richness(observed, singletons, doubletons, sampled, total, cap)
+        assert observed <= low <= estimate <= high
+        # Found items bound the full run through the sampling fraction
+        assert estimate <= observed * total / sampled
+        if cap is not None:
+            assert high <= cap
+
+def test_estimate_random_frequencies_within_bounds():
+    rng = random.Random(1)
+    for _ in range(2000):
+        total = rng.randrange(2, 10 ** 6)
+        sampled = rng.randrange(1, total)
+        observed = rng.randrange(1, 5000)
+        singletons = rng.randrange(0, observed + 1)
+        doubletons = rng.randrange(0, observed - singletons + 1)
+        estimate, low, high = wlmaker.estimate_richness(observed, singletons, doubletons, sampled, total, total)
+        assert observed <= low <= estimate <= high <= max(total, observed)
+
+def write_dump(path, strata):
+    with open(path, 'w') as f:
+        for segment, count in strata:
+            for i in range(count):
+                f.write(f"https://example.com/{segment}/{i}\n")
+
+@pytest.mark.parametrize("strata,sample_size", [
+    ([('a', 100000)], 1000),
+    ([('a', 90000), ('b', 10000)], 1000),
+    ([('a', 5000)] + [(f"s{i}", 1) for i in range(300)], 1000),
+    ([('a', 50), ('b', 30)], 1000),
+])
+def test_sample_is_full_size_and_proportional(tmp_path, strata, sample_size):
+    dump = str(tmp_path / "dump.txt")
+    write_dump(dump, strata)
+    sample, total, _ = wlmaker.sample_urls([('wayback', dump)], sample_size)
+    assert len(sample) == min(sample_size, total)
+    for segment, count in strata:
+        share = sum(1 for url, _ in sample if f"/{segment}/" in url) / len(sample)
+        assert abs(share - count / total) <= 1 / len(sample)
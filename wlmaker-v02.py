@@ -5,7 +5,7 @@ import argparse
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as minidom
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from urllib.parse import urlparse, parse_qs
 from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
 import warnings
@@ -14,6 +14,27 @@ import json
 from tqdm import tqdm
 import urllib3
 import sys
+import hashlib
+import mmap
+import threading
+import tempfile
+import shutil
+import random
+import math
+import time
+import signal
+import resource
+import queue
+import socket
+import functools
+import asyncio
+import multiprocessing
+from contextlib import contextmanager, ExitStack
+
+try:
+    import aiohttp  # Only needed for --engine async
+except ImportError:
+    aiohttp = None
 
 # Suppress insecure request warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -34,6 +55,56 @@ def sanitize_filename(target):
     domain = urlparse(target).netloc
     return domain.replace(".", "_")
 
+def target_output_dir(target, output_root="output"):
+    """Return the output directory for a target."""
+    return os.path.join(output_root, sanitize_filename(target))
+
+@contextmanager
+def atomic_open(filename, mode='w'):
+    """Write to a private temporary file and move it over filename once complete.
+    
+    Readers never see a half-written file, and processes writing the same file on a
+    shared filesystem replace it whole instead of interleaving.
+    """
+    tmp_file = f"{filename}.{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            yield f
+        os.replace(tmp_file, filename)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+# Public suffixes with more than one label that are common in scope lists. Anything
+# not listed here is treated as a single-label TLD when finding the apex domain.
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'net.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.nz', 'org.nz', 'co.jp', 'ne.jp', 'or.jp', 'co.kr', 'or.kr',
+    'com.br', 'com.cn', 'net.cn', 'org.cn', 'com.hk', 'com.tw', 'com.sg',
+    'co.in', 'net.in', 'org.in', 'co.za', 'com.mx', 'com.tr', 'com.ar',
+    'co.il', 'co.id', 'com.my', 'com.ph', 'com.vn', 'com.pk', 'com.ng',
+    'com.ua', 'com.pl', 'co.th', 'ac.ir', 'co.ir', 'gov.ir', 'org.ir',
+}
+
+def registrable_domain(host):
+    """Return the registrable (apex) domain of a host name."""
+    host = host.lower().rstrip('.')
+    if re.match(r'^\d{1,3}(?:\.\d{1,3}){3}$', host):
+        return host
+    labels = host.split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+def group_targets_by_apex(targets):
+    """Group targets by the registrable domain of their host, preserving order."""
+    groups = {}
+    for target in targets:
+        host = urlparse(target).hostname or ''
+        groups.setdefault(registrable_domain(host), []).append(target)
+    return groups
+
 def is_valid_url(url):
     """Check if the URL is valid."""
     regex = re.compile(
@@ -45,163 +116,822 @@ def is_valid_url(url):
         r'(?:/?|[/?]\S+)$', re.IGNORECASE)
     return re.match(regex, url)
 
-def run_katana(target, output_file, cookies=None, headers=None, depth=None, timeout=None, scope=None, exclude=None, proxy=None):
-    """Run Katana to crawl the target and save output."""
-    if not os.path.exists(output_file):
-        print(f"Crawling {target} with Katana...")
-        command = f"katana -u {target} -o {output_file}"
-        if cookies:
-            command += f" -H 'Cookie: {cookies}'"
-        if headers:
-            for key, value in headers.items():
-                command += f" -H '{key}: {value}'"
-        if depth:
-            command += f" -d {depth}"
-        if timeout:
-            command += f" -timeout {timeout}"
-        if scope:
-            command += f" -scope {scope}"
-        if exclude:
-            command += f" -exclude-pattern '{exclude}'"
-        if proxy:
-            command += f" -proxy {proxy}"
-        
-        try:
-            subprocess.run(command, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Katana execution failed for {target}: {e}")
-            print(f"Error running Katana on {target}. See error.log for details.")
-            with open(output_file, 'w') as f:
-                f.write(f"# Error running Katana on {target}\n")
-    else:
-        print(f"Using existing Katana output for {target}.")
+class Deadline:
+    """A point in time after which a target or one of its stages must stop."""
+    
+    def __init__(self, seconds=None, parent=None):
+        self.expires = time.monotonic() + seconds if seconds else None
+        if parent and parent.expires is not None and (self.expires is None or parent.expires < self.expires):
+            self.expires = parent.expires
+    
+    def stage(self, seconds=None):
+        """Return a deadline for a stage that also ends no later than this one."""
+        return Deadline(seconds, self)
+    
+    def remaining(self, cap=None):
+        """Return the seconds left, at most cap, or cap if there is no deadline."""
+        if self.expires is None:
+            return cap
+        left = max(0.0, self.expires - time.monotonic())
+        return left if cap is None else min(left, cap)
+    
+    def expired(self):
+        """Return True once the deadline has passed."""
+        return self.expires is not None and time.monotonic() >= self.expires
+
+def run_command(command, timeout=None, on_line=None):
+    """Run a shell command, killing its whole process group if it outlives the timeout.
+    
+    If on_line is given, the command's stdout is read as it runs and each stripped
+    line is passed to it.
+    """
+    process = subprocess.Popen(command, shell=True, start_new_session=True,
+                               stdout=subprocess.PIPE if on_line else None,
+                               encoding='utf-8', errors='ignore')
+    reader = None
+    if on_line:
+        def read_lines():
+            for line in process.stdout:
+                try:
+                    on_line(line.strip())
+                except Exception as e:
+                    logging.error(f"Error handling output line of '{command}': {e}")
+        reader = threading.Thread(target=read_lines, daemon=True)
+        reader.start()
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # The shell's children (katana, waybackurls) would survive killing only the shell
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+                process.wait(timeout=5)
+                break
+            except ProcessLookupError:
+                break
+            except subprocess.TimeoutExpired:
+                continue
+        raise
+    finally:
+        if reader:
+            reader.join()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, command)
 
-def run_waybackurls(target, output_file, timeout=None):
-    """Run waybackurls to fetch archived URLs and save output."""
-    if not os.path.exists(output_file):
-        print(f"Fetching URLs for {target} with waybackurls...")
-        command = f"echo {target} | waybackurls > {output_file}"
+def step(*call):
+    """Yield a single call, e.g. step(extract_data, path), for the engine to perform, and return its result."""
+    return (yield call)
+
+def drive(steps, perform=None):
+    """Run engine-neutral steps to completion in this thread and return their result.
+    
+    Stages are generators that yield each blocking call as a tuple of a function and
+    its arguments, and get back its result, or its exception raised where they
+    yielded. drive() performs each call with perform, by default calling it; the
+    async engine runs the same generators with drive_async().
+    """
+    perform = perform or (lambda function, *args: function(*args))
+    result, error = None, None
+    while True:
+        try:
+            call = steps.send(result) if error is None else steps.throw(error)
+        except StopIteration as stop:
+            return stop.value
         try:
-            subprocess.run(command, shell=True, check=True, timeout=timeout)
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Waybackurls execution failed for {target}: {e}")
-            print(f"Error running waybackurls on {target}. See error.log for details.")
-        except subprocess.TimeoutExpired:
-            logging.error(f"Waybackurls execution timed out for {target}")
-            print(f"Waybackurls timed out for {target}. Consider increasing the timeout.")
+            result, error = perform(*call), None
+        except Exception as e:
+            result, error = None, e
+
+def unfinished_file(output_file):
+    """Return where a tool writes its output until it has finished."""
+    return f"{output_file}.part"
+
+def finish_output(output_file):
+    """Move a tool's finished output into place, so later runs reuse it."""
+    unfinished = unfinished_file(output_file)
+    if os.path.exists(unfinished):
+        os.replace(unfinished, output_file)
     else:
-        print(f"Using existing waybackurls output for {target}.")
+        open(output_file, 'w').close()  # The tool found nothing to write
 
-def extract_data(file_path, target_dir):
-    """Extract parameters, directories, and subdomains using regex."""
-    # Enhanced patterns
-    param_pattern = re.compile(r'[?&]([a-zA-Z0-9_\-\.]+)=')
-    dir_pattern = re.compile(r'/([a-zA-Z0-9_\-\.]+)/')
-    subdomain_pattern = re.compile(r'https?://([a-zA-Z0-9][a-zA-Z0-9\-\.]*\.[a-zA-Z0-9\-\.]+)')
-    directory_pattern = re.compile(r'https?://[^/]+(/[^?#]+)')
-    static_file_pattern = re.compile(r'\.(?:js|css|pdf|jpg|jpeg|png|gif|svg|xml|json|csv|doc|docx|xls|xlsx|ppt|pptx|zip|tar|gz|rar|exe|dll|so|txt)(?:\?|#|$)')
-    fragment_pattern = re.compile(r'#([a-zA-Z0-9_\-\.]+)')
-    api_endpoint_pattern = re.compile(r'https?://[^/]+/(?:api|v\d+|graphql|rest|data|service)/([^?#]+)')
-    
-    params = set()
-    directories = set()
-    subdomains = set()
-    extracted_dirs = set()
-    static_files = set()
-    fragments = set()
-    api_endpoints = set()
+def discard_unfinished(output_file):
+    """Remove what an interrupted run of a tool left, so it is fetched again instead of passing for complete.
     
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            line = line.strip()
-            
-            # Parse URL to extract query parameters more accurately
-            url_obj = urlparse(line)
-            if url_obj.query:
-                query_params = parse_qs(url_obj.query)
-                # Filter out empty parameters
-                params.update([k for k in query_params.keys() if k])
-            
-            # Extract other patterns
-            params.update([p for p in param_pattern.findall(line) if p])
-            directories.update([d for d in dir_pattern.findall(line) if d])
-            
-            match = subdomain_pattern.search(line)
-            if match:
-                subdomains.add(match.group(1))
-            
-            dir_match = directory_pattern.search(line)
-            if dir_match:
-                path = dir_match.group(1).strip()
-                if path.startswith('/'):
-                    path = path[1:]  # Remove leading slash
-                if path:  # Only add non-empty paths
-                    extracted_dirs.add(path)
-            
-            if static_file_pattern.search(line):
-                static_files.add(line)
-            
-            frag_match = fragment_pattern.search(line)
-            if frag_match and frag_match.group(1):
-                fragments.add(frag_match.group(1))
-            
-            api_match = api_endpoint_pattern.search(line)
-            if api_match and api_match.group(1):
-                api_endpoints.add(api_match.group(1))
+    The file is unlinked rather than truncated, so a tool orphaned by a killed run
+    that still holds it open cannot write into the next run's output.
+    """
+    unfinished = unfinished_file(output_file)
+    if os.path.exists(unfinished):
+        os.remove(unfinished)
+
+def tool_output(output_file):
+    """Return the file to read a tool's URLs from: its finished output, or what it wrote before being stopped."""
+    return output_file if os.path.exists(output_file) else unfinished_file(output_file)
+
+def katana_command(target, output_file, cookies=None, headers=None, depth=None, timeout=None, scope=None, exclude=None, proxy=None):
+    """Build the Katana command line for a target."""
+    command = f"katana -u {target} -o {output_file}"
+    if cookies:
+        command += f" -H 'Cookie: {cookies}'"
+    if headers:
+        for key, value in headers.items():
+            command += f" -H '{key}: {value}'"
+    if depth:
+        command += f" -d {depth}"
+    if timeout:
+        command += f" -timeout {timeout}"
+    if scope:
+        command += f" -scope {scope}"
+    if exclude:
+        command += f" -exclude-pattern '{exclude}'"
+    if proxy:
+        command += f" -proxy {proxy}"
+    return command
+
+def katana_steps(target, output_file, cookies=None, headers=None, depth=None, timeout=None, scope=None, exclude=None,
+                 proxy=None, stage_timeout=None, on_url=None):
+    """Run Katana to crawl the target and save output, as steps for drive() or drive_async().
+    
+    The crawl only becomes output_file once Katana exits cleanly; until then it is
+    in unfinished_file(output_file). Returns None unless Katana failed, in which
+    case it says so. A crawl stopped at stage_timeout is noted by the caller.
+    """
+    if os.path.exists(output_file):
+        print(f"Using existing Katana output for {target}.")
+        return None
+    
+    print(f"Crawling {target} with Katana...")
+    command = katana_command(target, unfinished_file(output_file), cookies, headers, depth, timeout, scope, exclude, proxy)
+    try:
+        yield run_command, command, stage_timeout, on_url
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Katana execution failed for {target}: {e}")
+        print(f"Error running Katana on {target}. See error.log for details.")
+        return "katana failed"
+    except subprocess.TimeoutExpired:
+        logging.error(f"Katana stopped after its time budget for {target}")
+        print(f"Katana ran out of time on {target}. Keeping the URLs crawled so far.")
+        return None
+    finish_output(output_file)
+    return None
+
+class StreamedOutput:
+    """Write the lines a command prints to a file, passing each one on as it arrives."""
+    
+    def __init__(self, output_file, on_line):
+        self.file = open(output_file, 'w', encoding='utf-8')
+        self.on_line = on_line
+    
+    def __call__(self, line):
+        self.file.write(line + '\n')
+        self.on_line(line)
     
-    # Save API endpoints
-    save_wordlist(api_endpoints, os.path.join(target_dir, "api_endpoints.txt"))
-    save_wordlist(static_files, os.path.join(target_dir, "static_files.txt"))
-    save_wordlist(fragments, os.path.join(target_dir, "fragments.txt"))
+    def close(self):
+        self.file.close()
+
+def wayback_command(target, output_file, on_url=None):
+    """Build the waybackurls command line for a target and, when streaming, the handler of its lines.
     
-    return params, directories, subdomains, extracted_dirs, api_endpoints
+    Without on_url the shell writes the URLs, which is fastest for dumps of millions
+    of lines; with it they are read here, saved and passed to on_url one by one.
+    """
+    if on_url:
+        return f"echo {target} | waybackurls", StreamedOutput(unfinished_file(output_file), on_url)
+    return f"echo {target} | waybackurls > {unfinished_file(output_file)}", None
 
-def extract_post_params(url, cookies=None, headers=None):
-    """Extract POST parameters from HTML forms."""
+def waybackurls_steps(target, output_file, deadline=None, wayback_cache=None, on_url=None):
+    """Run waybackurls to fetch archived URLs and save output, as steps for drive() or drive_async().
+    
+    As with katana_steps(), the URLs only become output_file once waybackurls exits
+    cleanly, and on_url, if given, is called with each one as it arrives. Waiting
+    for and falling back from a shared apex fetch all happen before the deadline.
+    Returns None once the URLs are there, otherwise why the output is incomplete.
+    """
+    deadline = deadline or Deadline()
+    if os.path.exists(output_file):
+        print(f"Using existing waybackurls output for {target}.")
+        return None
+    if wayback_cache and wayback_cache.covers(target):
+        problem = yield wayback_cache.partition, target, deadline
+        if not problem:
+            return None
+        if deadline.expired():
+            return problem
+        print(f"Shared archive fetch for {target} unusable ({problem}), fetching its URLs separately.")
+    
+    print(f"Fetching URLs for {target} with waybackurls...")
+    command, on_line = wayback_command(target, output_file, on_url)
     try:
-        response = requests.get(url, cookies=cookies, headers=headers, timeout=10, verify=False)
-        
-        # Check content type to determine parser
-        content_type = response.headers.get('content-type', '').lower()
-        if 'xml' in content_type:
-            soup = BeautifulSoup(response.text, 'xml')
-        else:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-        post_params = set()
+        yield run_command, command, deadline.remaining(), on_line
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Waybackurls execution failed for {target}: {e}")
+        print(f"Error running waybackurls on {target}. See error.log for details.")
+        return "waybackurls failed"
+    except subprocess.TimeoutExpired:
+        logging.error(f"Waybackurls execution timed out for {target}")
+        print(f"Waybackurls timed out for {target}. Consider increasing the timeout.")
+        return "waybackurls timed out"
+    finally:
+        if on_line:
+            on_line.close()
+    finish_output(output_file)
+    return None
+
+def run_waybackurls(*args, **kwargs):
+    """Run waybackurls in this thread, with the arguments of waybackurls_steps()."""
+    return drive(waybackurls_steps(*args, **kwargs))
+
+class WaybackCache:
+    """Domain-wide waybackurls dumps shared by targets under the same apex domain.
+    
+    waybackurls already returns URLs for every subdomain of the domain it is given,
+    so targets sharing an apex are served from one fetch of the apex. The dump is
+    split by host into each target's wayback_output.txt in a single pass, and kept
+    in a temporary directory until close() at the end of the run. A dump whose
+    fetch failed or timed out is never split; its targets fetch their own URLs.
+    """
+    
+    # Only a host's own URLs and those of its subdomains go to a target
+    host_pattern = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.\-]*://(?:[^@/?#]*@)?([^:/?#\s]+)')
+    
+    def __init__(self, targets, output_root="output"):
+        self.cache_dir = tempfile.mkdtemp(prefix='wlmaker-wayback-')
+        self.output_root = output_root
+        self.groups = {}
+        for apex, group in group_targets_by_apex(targets).items():
+            hosts = {urlparse(target).hostname for target in group}
+            if apex and len(hosts) > 1:
+                self.groups[apex] = group
+        self.locks = {apex: threading.Lock() for apex in self.groups}
+        self.dumps = {}
+    
+    def covers(self, target):
+        """Return True if the target's URLs come from a shared apex fetch."""
+        return registrable_domain(urlparse(target).hostname or '') in self.groups
+    
+    def _lock(self, apex, deadline):
+        """Take the lock of an apex, waiting no longer than the deadline; return False if it was not taken."""
+        left = deadline.remaining()
+        return self.locks[apex].acquire(timeout=-1 if left is None else left)
+    
+    def fetch(self, apex, deadline):
+        """Fetch the archived URLs of an apex domain once per run, before the deadline.
         
-        # Extract from regular forms
-        forms = soup.find_all('form', method=lambda x: x and x.lower() == 'post')
-        for form in forms:
-            inputs = form.find_all(['input', 'textarea', 'select'], {'name': True})
-            for inp in inputs:
-                post_params.add(inp['name'])
+        Returns the dump path and, if the fetch failed or timed out, why.
+        """
+        if not self._lock(apex, deadline):
+            return None, "waybackurls timed out waiting for the shared archive fetch"
+        try:
+            if apex not in self.dumps:
+                dump_file = os.path.join(self.cache_dir, f"{apex}.txt")
+                self.dumps[apex] = (dump_file, run_waybackurls(apex, dump_file, deadline))
+            return self.dumps[apex]
+        finally:
+            self.locks[apex].release()
+    
+    def partition(self, target, deadline):
+        """Split the apex dump by host into the wayback output of every target in the group.
         
-        # Extract from potential API calls in JavaScript
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string:
-                # Look for fetch, axios, ajax patterns
-                ajax_pattern = re.compile(r'(?:fetch|axios\.post|ajax|\.post)\s*\(\s*[\'"]([^\'"]+)[\'"]')
-                for endpoint in ajax_pattern.findall(script.string):
-                    if not endpoint.startswith(('http://', 'https://')):
-                        base_url = urlparse(url)
-                        full_url = f"{base_url.scheme}://{base_url.netloc}{endpoint if endpoint.startswith('/') else '/' + endpoint}"
-                        post_params.add(full_url)  # Save the complete URL as it's likely an API endpoint
+        Returns None on success, or why the shared dump could not be used.
+        """
+        apex = registrable_domain(urlparse(target).hostname or '')
+        dump_file, problem = self.fetch(apex, deadline)
+        if problem:
+            # A truncated dump would pass for a complete one in every target and later run
+            return problem
         
-        return post_params
+        if not self._lock(apex, deadline):
+            return "waybackurls timed out waiting for the shared archive split"
+        try:
+            outputs = {}
+            for member in self.groups[apex]:
+                output_file = os.path.join(target_output_dir(member, self.output_root), "wayback_output.txt")
+                if not os.path.exists(output_file):
+                    outputs.setdefault(urlparse(member).hostname, set()).add(output_file)
+            if not outputs:
+                return None
+            
+            print(f"Splitting archived URLs of {apex} across {len(outputs)} targets...")
+            with ExitStack() as stack:
+                handles = {}
+                for output_files in outputs.values():
+                    for output_file in output_files:
+                        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                        handles[output_file] = stack.enter_context(atomic_open(output_file))
+                
+                if os.path.exists(dump_file):
+                    with open(dump_file, 'r', encoding='utf-8', errors='ignore') as f:
+                        for line in f:
+                            match = self.host_pattern.match(line)
+                            if not match:
+                                continue
+                            labels = match.group(1).lower().rstrip('.').split('.')
+                            # The URL belongs to its own host and to every parent domain that is a target
+                            for i in range(len(labels) - 1):
+                                for output_file in outputs.get('.'.join(labels[i:]), ()):
+                                    handles[output_file].write(line)
+            return None
+        finally:
+            self.locks[apex].release()
+    
+    def close(self):
+        """Remove the cached dumps."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+# Enhanced patterns
+param_pattern = re.compile(r'[?&]([a-zA-Z0-9_\-\.]+)=')
+dir_pattern = re.compile(r'/([a-zA-Z0-9_\-\.]+)/')
+subdomain_pattern = re.compile(r'https?://([a-zA-Z0-9][a-zA-Z0-9\-\.]*\.[a-zA-Z0-9\-\.]+)')
+directory_pattern = re.compile(r'https?://[^/]+(/[^?#]+)')
+static_file_pattern = re.compile(r'\.(?:js|css|pdf|jpg|jpeg|png|gif|svg|xml|json|csv|doc|docx|xls|xlsx|ppt|pptx|zip|tar|gz|rar|exe|dll|so|txt)(?:\?|#|$)')
+fragment_pattern = re.compile(r'#([a-zA-Z0-9_\-\.]+)')
+api_endpoint_pattern = re.compile(r'https?://[^/]+/(?:api|v\d+|graphql|rest|data|service)/([^?#]+)')
+
+CATEGORIES = ('params', 'directories', 'subdomains', 'extracted_dirs', 'static_files', 'fragments', 'api_endpoints')
+
+def query_param_names(line):
+    """Return the query parameter names of a URL as parse_qs sees them."""
+    # Parse URL to extract query parameters more accurately
+    try:
+        query = urlparse(line).query
+    except ValueError:
+        # urlparse rejects hosts such as a broken IPv6 literal; the query is still usable
+        query = line.split('#', 1)[0].partition('?')[2]
+    if query:
+        query_params = parse_qs(query)
+        # Filter out empty parameters
+        return [k for k in query_params.keys() if k]
+    return []
+
+def extract_line(line, found):
+    """Add what a single stripped URL line contains to the per-category sets in found."""
+    found['params'].update(query_param_names(line))
+    
+    # Extract other patterns
+    found['params'].update([p for p in param_pattern.findall(line) if p])
+    found['directories'].update([d for d in dir_pattern.findall(line) if d])
+    
+    match = subdomain_pattern.search(line)
+    if match:
+        found['subdomains'].add(match.group(1))
+    
+    dir_match = directory_pattern.search(line)
+    if dir_match:
+        path = dir_match.group(1).strip()
+        if path.startswith('/'):
+            path = path[1:]  # Remove leading slash
+        if path:  # Only add non-empty paths
+            found['extracted_dirs'].add(path)
+    
+    if static_file_pattern.search(line):
+        found['static_files'].add(line)
+    
+    frag_match = fragment_pattern.search(line)
+    if frag_match and frag_match.group(1):
+        found['fragments'].add(frag_match.group(1))
+    
+    api_match = api_endpoint_pattern.search(line)
+    if api_match and api_match.group(1):
+        found['api_endpoints'].add(api_match.group(1))
+
+# Bytes counterparts of the patterns above, run over whole chunks of lines at once.
+# Negated classes also exclude newlines so no match spans two URLs.
+bytes_param_pattern = re.compile(rb'[?&]([a-zA-Z0-9_\-\.]+)=')
+bytes_dir_pattern = re.compile(rb'/([a-zA-Z0-9_\-\.]+)/')
+bytes_subdomain_pattern = re.compile(rb'https?://([a-zA-Z0-9][a-zA-Z0-9\-\.]*\.[a-zA-Z0-9\-\.]+)')
+bytes_directory_pattern = re.compile(rb'https?://[^/\n]+(/[^?#\n]+)')
+bytes_static_file_pattern = re.compile(rb'\.(?:js|css|pdf|jpg|jpeg|png|gif|svg|xml|json|csv|doc|docx|xls|xlsx|ppt|pptx|zip|tar|gz|rar|exe|dll|so|txt)(?:\?|#|[ \t\x0b\x0c]*$)', re.M)
+bytes_fragment_pattern = re.compile(rb'#([a-zA-Z0-9_\-\.]+)')
+bytes_api_endpoint_pattern = re.compile(rb'https?://[^/\n]+/(?:api|v\d+|graphql|rest|data|service)/([^?#\n]+)')
+
+# Lines the bytes path would not treat exactly like the text path go through
+# extract_line() instead: anything outside printable ASCII (UTF-8 decoding, Unicode
+# whitespace, \r as a line break) and brackets (urlparse checks them as IPv6 hosts).
+bytes_slow_char_pattern = re.compile(rb'[^\t\n\x0b\x0c\x20-\x5a\x5c\x5e-\x7e]')
+# Query keys that parse_qs unquotes into something param_pattern cannot see
+bytes_query_key_pattern = re.compile(rb'[?&][^&=\n]*[^a-zA-Z0-9_\-\.&=\n][^&=\n]*=')
+
+EXTRACT_CHUNK_SIZE = 16 << 20
+
+def _first_matches(pattern, chunk):
+    """Yield the first match of pattern on each line of chunk, as search() on each line would."""
+    line_end = -1
+    for match in pattern.finditer(chunk):
+        if match.start() <= line_end:
+            continue
+        line_end = chunk.find(b'\n', match.start())
+        if line_end < 0:
+            line_end = len(chunk)
+        yield match
+
+def _line_spans(pattern, chunk):
+    """Return the (start, end) spans, newline included, of the lines of chunk matching pattern."""
+    spans = []
+    for match in _first_matches(pattern, chunk):
+        start = chunk.rfind(b'\n', 0, match.start()) + 1
+        end = chunk.find(b'\n', match.start())
+        spans.append((start, len(chunk) if end < 0 else end + 1))
+    return spans
+
+def scan_chunk(chunk, found):
+    """Add what a chunk of whole lines contains to found, matching extract_line() line by line.
+    
+    Patterns run over the raw bytes of the whole chunk and only matched substrings are
+    decoded. Lines with bytes outside printable ASCII are decoded and handed to
+    extract_line(), and lines with unusual query keys also get parse_qs run on them.
+    """
+    spans = _line_spans(bytes_slow_char_pattern, chunk)
+    if spans:
+        clean = []
+        pos = 0
+        for start, end in spans:
+            clean.append(chunk[pos:start])
+            # Decode like a text-mode file would: invalid bytes dropped, \r\n and \r as line breaks
+            text = chunk[start:end].decode('utf-8', errors='ignore')
+            for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+                extract_line(line.strip(), found)
+            pos = end
+        clean.append(chunk[pos:])
+        chunk = b''.join(clean)
+    
+    for start, end in _line_spans(bytes_query_key_pattern, chunk):
+        found['params'].update(query_param_names(chunk[start:end].strip().decode('ascii')))
+    
+    found['params'].update(p.decode('ascii') for p in set(bytes_param_pattern.findall(chunk)))
+    found['directories'].update(d.decode('ascii') for d in set(bytes_dir_pattern.findall(chunk)))
+    
+    subdomains = {match.group(1) for match in _first_matches(bytes_subdomain_pattern, chunk)}
+    found['subdomains'].update(d.decode('ascii') for d in subdomains)
+    
+    paths = {match.group(1) for match in _first_matches(bytes_directory_pattern, chunk)}
+    for path in paths:
+        path = path.strip()
+        if path.startswith(b'/'):
+            path = path[1:]  # Remove leading slash
+        if path:  # Only add non-empty paths
+            found['extracted_dirs'].add(path.decode('ascii'))
+    
+    static_lines = {chunk[start:end].strip() for start, end in _line_spans(bytes_static_file_pattern, chunk)}
+    found['static_files'].update(line.decode('ascii') for line in static_lines)
+    
+    fragments = {match.group(1) for match in _first_matches(bytes_fragment_pattern, chunk)}
+    found['fragments'].update(f.decode('ascii') for f in fragments)
+    
+    for match in _first_matches(bytes_api_endpoint_pattern, chunk):
+        endpoint = match.group(1)
+        if match.end() == len(chunk) or chunk[match.end()] == 0x0a:
+            endpoint = endpoint.rstrip()  # The text path sees the line already stripped
+        if endpoint:
+            found['api_endpoints'].add(endpoint.decode('ascii'))
+
+def extract_data(file_path, deadline=None, on_new=None, fast=True):
+    """Extract parameters, directories, and subdomains using regex, returning a set per category.
+    
+    By default the file is scanned in large binary chunks with scan_chunk(); with
+    fast=False it is read line by line as text, which gives the same results.
+    Stops early, keeping what was found so far, once the deadline has passed.
+    If on_new is given, it is called with (category, value) the first time an
+    item turns up in the file. A chunk that fails to scan is retried line by
+    line, and only lines that still fail are skipped.
+    """
+    found = {category: set() for category in CATEGORIES}
+    
+    def extract_lines(lines, lines_found):
+        for line in lines:
+            try:
+                extract_line(line.strip(), lines_found)
+            except Exception as e:
+                logging.error(f"Skipping a line of {file_path}: {e}")
+    
+    def scan(chunk, chunk_found):
+        try:
+            scan_chunk(chunk, chunk_found)
+        except Exception as e:
+            logging.error(f"Error scanning {file_path}, retrying a chunk line by line: {e}")
+            text = chunk.decode('utf-8', errors='ignore')
+            extract_lines(text.replace('\r\n', '\n').replace('\r', '\n').split('\n'), chunk_found)
+    
+    def report(batch_found):
+        for category, items in batch_found.items():
+            for item in items - found[category]:
+                found[category].add(item)
+                on_new(category, item)
+    
+    if fast:
+        with open(file_path, 'rb') as f:
+            rest = b''
+            while True:
+                block = f.read(EXTRACT_CHUNK_SIZE)
+                chunk = rest + block
+                if block:
+                    # Keep the incomplete last line for the next chunk
+                    cut = chunk.rfind(b'\n') + 1
+                    chunk, rest = chunk[:cut], chunk[cut:]
+                if chunk:
+                    if on_new:
+                        chunk_found = {category: set() for category in CATEGORIES}
+                        scan(chunk, chunk_found)
+                        report(chunk_found)
+                    else:
+                        scan(chunk, found)
+                if not block or (deadline and deadline.expired()):
+                    break
+    else:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for count, line in enumerate(f):
+                if deadline and not count % 4096 and deadline.expired():
+                    break
+                if not on_new:
+                    extract_lines((line,), found)
+                    continue
+                line_found = {category: set() for category in CATEGORIES}
+                extract_lines((line,), line_found)
+                report(line_found)
+    
+    return found
+
+def fetch_page(url, cookies=None, headers=None, timeout=10):
+    """Fetch a page within timeout seconds in total and return its text, content type and HTTP status.
+    
+    requests only bounds each connect and socket read, so a server sending a byte
+    every few seconds could hold the caller indefinitely. The body is therefore
+    read one socket read at a time, each allowed only the time that is left.
+    """
+    give_up = time.monotonic() + timeout
+    with requests.get(url, cookies=cookies, headers=headers, timeout=timeout, verify=False, stream=True) as response:
+        sock = getattr(response.raw.connection, 'sock', None)
+        # read1() returns after a single socket read; older urllib3 only has read()
+        read = getattr(response.raw, 'read1', response.raw.read)
+        body = []
+        while True:
+            left = give_up - time.monotonic()
+            if left <= 0:
+                raise requests.Timeout(f"Page not received within {timeout:.0f} seconds")
+            if sock:
+                sock.settimeout(left)
+            block = read(65536, decode_content=True)
+            if not block:
+                break
+            body.append(block)
+        text = b''.join(body).decode(response.encoding or 'utf-8', errors='replace')
+        return text, response.headers.get('content-type', ''), response.status_code
+
+def extract_post_params(url, cookies=None, headers=None, timeout=10):
+    """Extract POST parameters from HTML forms and return them with the HTTP status.
+    
+    Returns None if the page could not be processed.
+    """
+    try:
+        text, content_type, status = fetch_page(url, cookies, headers, timeout)
+        return parse_post_params(url, text, content_type), status
     except Exception as e:
         logging.error(f"Error extracting POST params from {url}: {e}")
-        return set()
+        return None
+
+def parse_post_params(url, text, content_type=''):
+    """Extract POST parameters from the forms and scripts of a fetched page."""
+    # Check content type to determine parser
+    content_type = content_type.lower()
+    if 'xml' in content_type:
+        soup = BeautifulSoup(text, 'xml')
+    else:
+        soup = BeautifulSoup(text, 'html.parser')
+        
+    post_params = set()
+    
+    # Extract from regular forms
+    forms = soup.find_all('form', method=lambda x: x and x.lower() == 'post')
+    for form in forms:
+        inputs = form.find_all(['input', 'textarea', 'select'], {'name': True})
+        for inp in inputs:
+            post_params.add(inp['name'])
+    
+    # Extract from potential API calls in JavaScript
+    scripts = soup.find_all('script')
+    for script in scripts:
+        if script.string:
+            # Look for fetch, axios, ajax patterns
+            ajax_pattern = re.compile(r'(?:fetch|axios\.post|ajax|\.post)\s*\(\s*[\'"]([^\'"]+)[\'"]')
+            for endpoint in ajax_pattern.findall(script.string):
+                if not endpoint.startswith(('http://', 'https://')):
+                    base_url = urlparse(url)
+                    full_url = f"{base_url.scheme}://{base_url.netloc}{endpoint if endpoint.startswith('/') else '/' + endpoint}"
+                    post_params.add(full_url)  # Save the complete URL as it's likely an API endpoint
+    
+    return post_params
+
+# Cached POST parameters are reused for this long, e.g. by the full run after a preview.
+# Daily runs fetch pages again, since forms change.
+POST_CACHE_MAX_AGE = 6 * 3600
+
+def post_cache_scope(cookies=None, headers=None):
+    """Return a digest of the credentials pages are fetched with, so each identity has its own cache entries."""
+    identity = json.dumps([cookies or '', sorted((headers or {}).items())])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+
+def post_cache_line(url, scope, params):
+    """Return the cache file line recording the POST parameters of a freshly fetched page."""
+    return json.dumps({'url': url, 'scope': scope, 'time': time.time(), 'params': sorted(params)}) + '\n'
+
+def load_post_cache(cache_file, scope, max_age=POST_CACHE_MAX_AGE):
+    """Load the POST parameters of pages fetched with the same credentials in the last max_age seconds.
+    
+    Expired, superseded and truncated lines are dropped from the file, so it holds
+    at most one recent line per page and credentials instead of growing every run.
+    """
+    cache = {}
+    if not os.path.exists(cache_file):
+        return cache
+    oldest = time.time() - max_age
+    fresh = {}
+    lines = 0
+    with open(cache_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            lines += 1
+            try:
+                entry = json.loads(line)
+                if entry['time'] < oldest:
+                    continue
+                fresh[(entry.get('scope'), entry['url'])] = line.rstrip('\n') + '\n'
+                if entry.get('scope') == scope:
+                    cache[entry['url']] = set(entry['params'])
+            except (ValueError, KeyError, TypeError):
+                continue  # Ignore a line truncated by an interrupted run
+    if len(fresh) < lines:
+        with atomic_open(cache_file) as f:
+            f.writelines(fresh.values())
+    return cache
+
+class PostParamsCollector:
+    """Bookkeeping shared by collect_post_params() and collect_post_params_async().
+    
+    Pages recorded in cache_file by a recent run with the same cookies and headers
+    are served by cached(), and every page fetched with a 2xx status is appended to
+    it by fetched(), so a preview or interrupted run is reused. Both record the
+    page's parameters in results and pass them to on_page, if given.
+    """
+    
+    def __init__(self, cache_file=None, cookies=None, headers=None, on_page=None):
+        self.scope = post_cache_scope(cookies, headers)
+        self.cache = load_post_cache(cache_file, self.scope) if cache_file else {}
+        self.cache_out = open(cache_file, 'a', encoding='utf-8') if cache_file else None
+        self.on_page = on_page
+        self.results = {}
+    
+    def _found(self, url, params):
+        self.results[url] = params
+        if self.on_page:
+            self.on_page(url, params)
+    
+    def cached(self, url):
+        """Record a page from the cache and return True, or return False if it has to be fetched."""
+        if url not in self.cache:
+            return False
+        self._found(url, self.cache[url])
+        return True
+    
+    def fetched(self, url, params, status):
+        """Record a freshly fetched page."""
+        self._found(url, params)
+        # Error pages and rate limits must not stand in for the real page later
+        if 200 <= status < 300:
+            self.cache[url] = params
+            if self.cache_out:
+                self.cache_out.write(post_cache_line(url, self.scope, params))
+                self.cache_out.flush()
+    
+    def close(self):
+        if self.cache_out:
+            self.cache_out.close()
+
+def collect_post_params(urls, cookies=None, headers=None, cache_file=None, deadline=None, on_page=None):
+    """Extract POST parameters for each URL and return them per URL.
+    
+    Pages in the POST cache are not fetched again; see PostParamsCollector.
+    Fetching stops once the deadline has passed, and no request may outlive it.
+    on_page, if given, is called with (url, params) as each page is done.
+    """
+    collector = PostParamsCollector(cache_file, cookies, headers, on_page)
+    try:
+        for url in urls:
+            try:
+                if collector.cached(url):
+                    continue
+                if deadline and deadline.expired():
+                    break
+                page = extract_post_params(url, cookies, headers, deadline.remaining(10) if deadline else 10)
+                if page is not None:
+                    collector.fetched(url, *page)
+            except Exception as e:
+                logging.error(f"Error processing URL for POST params: {url}, Error: {e}")
+    finally:
+        collector.close()
+    return collector.results
+
+def read_urls(file_path):
+    """Yield the URLs of a crawler output file, skipping blanks and comment lines."""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith('#'):
+                yield url
+
+class EventStream:
+    """Write findings as deduplicated JSONL events, one per line, as soon as they are found.
+    
+    Events go through a bounded queue to a single writer thread. When the reader on
+    the other end of the pipe falls behind, the queue fills up and emit() blocks, so
+    a slow consumer throttles the scan instead of growing memory. If the reader goes
+    away, events are dropped and the scan carries on writing its files.
+    """
+    
+    def __init__(self, stream, max_pending=10000):
+        self.stream = stream
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.seen = set()
+        self.lock = threading.Lock()
+        self.broken = False
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+    
+    def emit(self, target, category, value, source):
+        """Queue an event unless the same target, category and value was already sent."""
+        key = fingerprint(f"{target}\0{category}\0{value}")
+        with self.lock:
+            if key in self.seen or self.broken:
+                return
+            self.seen.add(key)
+        event = {'target': target, 'category': category, 'value': value, 'source': source}
+        self.pending.put(json.dumps(event, ensure_ascii=False))
+    
+    def emit_found(self, target, found, source):
+        """Queue an event for every item of a per-category result dict."""
+        for category, items in found.items():
+            for item in items:
+                self.emit(target, category, item, source)
+    
+    def _write(self):
+        while True:
+            line = self.pending.get()
+            if line is None:
+                break
+            if self.broken:
+                continue  # Keep draining so producers never block on a dead pipe
+            try:
+                self.stream.write(line + '\n')
+                # Flush per line unless more events are already waiting
+                if self.pending.empty():
+                    self.stream.flush()
+            except (BrokenPipeError, ValueError):
+                self.broken = True
+                logging.error("Event stream closed by the reader, no further events will be written")
+    
+    def close(self):
+        """Write out the queued events and stop the writer."""
+        self.pending.put(None)
+        self.writer.join()
+        if not self.broken:
+            try:
+                self.stream.flush()
+            except (BrokenPipeError, ValueError):
+                pass
+
+OUTPUT_FILES = {
+    'params': {'txt': 'params_wordlist.txt', 'json': 'params.json', 'xml': 'params.xml'},
+    'directories': {'txt': 'directories_wordlist.txt', 'json': 'directories.json', 'xml': 'directories.xml'},
+    'subdomains': {'txt': 'subdomains_wordlist.txt', 'json': 'subdomains.json', 'xml': 'subdomains.xml'},
+    'extracted_dirs': {'txt': 'extracted_directories_wordlist.txt', 'json': 'extracted_dirs.json', 'xml': 'extracted_dirs.xml'},
+    'api_endpoints': {'txt': 'api_endpoints.txt', 'json': 'api_endpoints.json', 'xml': 'api_endpoints.xml'}
+}
+
+# Categories saved as plain wordlists whatever the output format, except none
+WORDLIST_FILES = {
+    'static_files': 'static_files.txt',
+    'fragments': 'fragments.txt'
+}
+
+def save_outputs(results, target_dir, output_format, rename=None):
+    """Save each result category in the requested output formats, or nothing for format none."""
+    for data_type, file_info in OUTPUT_FILES.items():
+        names = {fmt: rename(name) if rename else name for fmt, name in file_info.items()}
+        if output_format == 'txt' or output_format == 'all':
+            save_wordlist(results[data_type], os.path.join(target_dir, names['txt']))
+        if output_format == 'json' or output_format == 'all':
+            save_json(results[data_type], os.path.join(target_dir, names['json']))
+        if output_format == 'xml' or output_format == 'all':
+            save_xml(results[data_type], os.path.join(target_dir, names['xml']), data_type)
+    if output_format != 'none':
+        for data_type, filename in WORDLIST_FILES.items():
+            save_wordlist(results[data_type], os.path.join(target_dir, rename(filename) if rename else filename))
 
 def save_wordlist(data, filename):
     """Save extracted data to a file without extra newlines."""
-    with open(filename, 'w', encoding='utf-8') as f:
+    with atomic_open(filename) as f:
         f.write('\n'.join(sorted(data)))
 
 def save_json(data, filename):
     """Save data in JSON format."""
-    with open(filename, 'w', encoding='utf-8') as f:
+    with atomic_open(filename) as f:
         json.dump(list(data), f, indent=4)
 
 def save_xml(data, filename, root_name='data'):
@@ -221,89 +951,886 @@ def save_xml(data, filename, root_name='data'):
         # Pretty print XML
         xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        with atomic_open(filename) as f:
             f.write(xml_str)
     except Exception as e:
         logging.error(f"Error saving XML file {filename}: {str(e)}")
         # Fallback to simple XML format
         tree = ET.ElementTree(root)
-        tree.write(filename, encoding='utf-8', xml_declaration=True)
+        with atomic_open(filename, 'wb') as f:
+            tree.write(f, encoding='utf-8', xml_declaration=True)
+
+# Delta mode keeps one index per target and category under output/<target>/.index/.
+# An index is a flat file of sorted 8-byte blake2b fingerprints, so lookups are a
+# binary search over an mmap and merging never loads the history into memory.
+FINGERPRINT_SIZE = 8
+INDEX_COPY_CHUNK = 1 << 20  # fingerprints copied per write when merging
+
+def fingerprint(item):
+    """Return the fixed-size fingerprint of an item for the delta index."""
+    return hashlib.blake2b(str(item).encode('utf-8', 'surrogatepass'), digest_size=FINGERPRINT_SIZE).digest()
 
-def process_target(target, cookies=None, headers=None, depth=None, timeout=None, 
-                  output_format='txt', proxy=None, scope=None, exclude=None, 
-                  wayback_timeout=None):
-    """Process a single target."""
+def _index_search(index, lo, count, fp):
+    """Return the first record position at or after lo whose fingerprint is >= fp.
+    
+    Gallops forward from lo before bisecting, since consecutive lookups of a
+    sorted batch usually land close to each other.
+    """
+    step = 1
+    hi = lo
+    while hi < count:
+        offset = hi * FINGERPRINT_SIZE
+        if index[offset:offset + FINGERPRINT_SIZE] >= fp:
+            break
+        lo = hi + 1
+        hi = lo + step
+        step *= 2
+    hi = min(hi, count)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        offset = mid * FINGERPRINT_SIZE
+        if index[offset:offset + FINGERPRINT_SIZE] < fp:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _copy_index_range(index, start, end, out):
+    """Copy records [start, end) of the index to out in bounded chunks."""
+    while start < end:
+        stop = min(end, start + INDEX_COPY_CHUNK)
+        out.write(index[start * FINGERPRINT_SIZE:stop * FINGERPRINT_SIZE])
+        start = stop
+
+def _index_record(index, pos, count):
+    """Return the fingerprint at a record position, or None past the end."""
+    if pos >= count:
+        return None
+    return index[pos * FINGERPRINT_SIZE:(pos + 1) * FINGERPRINT_SIZE]
+
+@contextmanager
+def update_index(data, index_file):
+    """Merge data into a sorted fingerprint index and yield the items it did not contain.
+    
+    The merged index only replaces the old one once the with block completes, so
+    items are not recorded as seen unless the caller managed to save them.
+    """
+    by_fp = {fingerprint(item): item for item in data}
+    fresh = sorted(by_fp)
+    new_items = set()
+    
+    os.makedirs(os.path.dirname(index_file), exist_ok=True)
+    size = os.path.getsize(index_file) if os.path.exists(index_file) else 0
+    count = size // FINGERPRINT_SIZE
+    
+    with atomic_open(index_file, 'wb') as out:
+        if count:
+            with open(index_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                pos = 0
+                head = _index_record(index, pos, count)
+                pending = []
+                for fp in fresh:
+                    if head is not None and head < fp:
+                        # Skip ahead in the history; everything before fp is already sorted output
+                        found = _index_search(index, pos + 1, count, fp)
+                        out.write(b''.join(pending))
+                        pending = []
+                        _copy_index_range(index, pos, found, out)
+                        pos = found
+                        head = _index_record(index, pos, count)
+                    if head == fp:
+                        continue
+                    pending.append(fp)
+                    new_items.add(by_fp[fp])
+                out.write(b''.join(pending))
+                _copy_index_range(index, pos, count, out)
+        else:
+            out.write(b''.join(fresh))
+            new_items.update(by_fp.values())
+        yield new_items
+
+def delta_filename(filename):
+    """Return the name of the new-items variant of an output file."""
+    base, ext = os.path.splitext(filename)
+    return f"{base}_new{ext}"
+
+# Preview mode samples URLs per (host, first path segment) stratum
+stratum_pattern = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.\-]*://(?:[^@/?#\s]*@)?([^/?#\s]*)(/[^/?#\s]*)?')
+
+def stratum_key(url):
+    """Return the (host, first path segment) stratum of a URL."""
+    match = stratum_pattern.match(url)
+    if not match:
+        return '', ''
+    return match.group(1).lower(), match.group(2) or '/'
+
+def allocate_sample(sizes, sample_size):
+    """Split sample_size URLs over strata in proportion to their sizes.
+    
+    Each stratum gets the whole part of its share, and the URLs rounding leaves
+    over go to the strata with the largest remainders. A share never exceeds the
+    stratum, so the whole budget is used whenever the strata hold that many URLs.
+    """
+    total = sum(sizes.values())
+    if total <= sample_size:
+        return dict(sizes)
+    allocation = {key: sample_size * size // total for key, size in sizes.items()}
+    leftover = sample_size - sum(allocation.values())
+    by_remainder = sorted(sizes, key=lambda key: (sample_size * sizes[key] % total, sizes[key]), reverse=True)
+    for key in by_remainder[:leftover]:
+        allocation[key] += 1
+    return allocation
+
+def sample_urls(sources, sample_size):
+    """Draw a stratified sample of at most sample_size URLs in two streaming passes.
+    
+    sources is a list of (source, file_path). Returns the sample as (url, source)
+    pairs, the number of URLs read and the number of strata seen. The first pass
+    counts the URLs of every stratum and allocate_sample() decides how many each
+    gets; the second keeps a reservoir of exactly that many per stratum, so memory
+    stays bounded by the sample size and the number of strata, never the dump size.
+    """
+    sizes = {}
+    for source, file_path in sources:
+        if os.path.exists(file_path):
+            for url in read_urls(file_path):
+                key = stratum_key(url)
+                sizes[key] = sizes.get(key, 0) + 1
+    total = sum(sizes.values())
+    allocation = allocate_sample(sizes, sample_size)
+    
+    reservoirs = {key: [] for key in allocation}
+    seen = dict.fromkeys(allocation, 0)
+    for source, file_path in sources:
+        if not os.path.exists(file_path):
+            continue
+        for url in read_urls(file_path):
+            key = stratum_key(url)
+            capacity = allocation.get(key, 0)
+            if not capacity:
+                continue
+            seen[key] += 1
+            reservoir = reservoirs[key]
+            if len(reservoir) < capacity:
+                reservoir.append((url, source))
+            else:
+                slot = random.randrange(seen[key])
+                if slot < capacity:
+                    reservoir[slot] = (url, source)
+    
+    sample = [item for reservoir in reservoirs.values() for item in reservoir]
+    if len(sample) != min(sample_size, total):
+        # Only possible if the files changed between the two passes
+        logging.error(f"Preview sample has {len(sample)} URLs instead of {min(sample_size, total)}")
+    return sample, total, len(sizes)
+
+# Categories a URL yields at most one item of, so a full run finds at most one per URL
+SINGLE_PER_URL = ('subdomains', 'extracted_dirs', 'static_files', 'fragments', 'api_endpoints')
+
+def estimate_richness(observed, singletons, doubletons, sampled, total, cap=None):
+    """Estimate the number of distinct items in all total URLs from a sample of sampled URLs.
+    
+    Uses Chao1 for sampling without replacement with its 95% log-normal confidence
+    interval, where singletons and doubletons count the items seen in exactly one
+    and two sampled URLs. An item of the full run is in the sample with a chance of
+    at least sampled/total, so the count scaled up by that fraction bounds the
+    estimate; it is what Chao1 tends to when most items were seen once. Everything
+    stays between observed and cap. Returns (estimate, low, high).
+    """
+    if singletons == 0 or sampled >= total:
+        return observed, observed, observed
+    
+    fraction = sampled / total
+    correction = sampled / (sampled - 1) if sampled > 1 else 1
+    if doubletons > 0:
+        unseen = singletons * singletons / (correction * 2 * doubletons + fraction / (1 - fraction) * singletons)
+        ratio = singletons / doubletons
+        variance = doubletons * (ratio ** 2 / 2 + ratio ** 3 + ratio ** 4 / 4)
+    else:
+        unseen = singletons * (singletons - 1) / (correction * 2 + fraction / (1 - fraction) * singletons)
+        variance = (singletons * (singletons - 1) / 2 + singletons * (2 * singletons - 1) ** 2 / 4
+                    - singletons ** 4 / (4 * (observed + unseen)))
+    
+    # Found items grow roughly like a Poisson count, less the share already sampled
+    scaled = observed / fraction
+    scaled_high = scaled + 1.96 * math.sqrt(observed * (1 - fraction)) / fraction
+    if unseen <= 0 or variance <= 0:
+        estimate = low = high = observed
+    else:
+        factor = math.exp(1.96 * math.sqrt(math.log(1 + variance / unseen ** 2)))
+        estimate, low, high = observed + unseen, observed + unseen / factor, observed + unseen * factor
+    
+    bound = lambda value, ceiling: max(observed, min(value, ceiling, cap if cap is not None else ceiling))
+    return bound(estimate, scaled), bound(low, scaled), bound(high, scaled_high)
+
+def run_preview(target, target_dir, katana_output, wayback_output, sample_size,
+                cookies=None, headers=None, output_format='txt', deadline=None):
+    """Extract a representative wordlist from a sample of the target's URLs.
+    
+    Results go to output/<target>/preview/ together with a summary estimating the
+    counts of a full run. POST parameters of the sampled Katana pages are recorded
+    in the target's POST cache, so a later full run does not fetch them again.
+    """
+    preview_dir = os.path.join(target_dir, "preview")
+    os.makedirs(preview_dir, exist_ok=True)
+    
+    sample, total, strata = sample_urls([('katana', katana_output), ('wayback', wayback_output)], sample_size)
+    print(f"Previewing {target} with {len(sample)} of {total} URLs from {strata} strata...")
+    
+    post_cache = os.path.join(target_dir, "post_params_cache.jsonl")
+    katana_urls = [url for url, source in sample if source == 'katana']
+    post_params = collect_post_params(katana_urls, cookies, headers, post_cache, deadline)
+    
+    found = {category: set() for category in CATEGORIES}
+    frequencies = {category: {} for category in CATEGORIES}
+    for url, source in sample:
+        url_found = {category: set() for category in CATEGORIES}
+        extract_line(url, url_found)
+        url_found['params'].update(post_params.get(url, ()))
+        for category, items in url_found.items():
+            found[category].update(items)
+            counts = frequencies[category]
+            for item in items:
+                counts[item] = counts.get(item, 0) + 1
+    
+    save_outputs(found, preview_dir, output_format)
+    
+    labels = [
+        ('params', 'Parameters'),
+        ('directories', 'Directories'),
+        ('subdomains', 'Subdomains'),
+        ('extracted_dirs', 'Extracted directory paths'),
+        ('api_endpoints', 'API endpoints')
+    ]
+    exhaustive = len(sample) == total
+    with atomic_open(os.path.join(preview_dir, "summary.txt")) as f:
+        f.write(f"Target: {target}\n")
+        f.write(f"Preview sample: {len(sample)} of {total} URLs across {strata} strata\n")
+        if not exhaustive:
+            f.write("Estimates use Chao1, capped by the sample scaled up to all URLs\n")
+        for category, label in labels:
+            observed = len(found[category])
+            if exhaustive:
+                f.write(f"{label} found: {observed} (complete, no URLs were left out)\n")
+                continue
+            counts = list(frequencies[category].values())
+            estimate, low, high = estimate_richness(observed, counts.count(1), counts.count(2), len(sample), total,
+                                                    total if category in SINGLE_PER_URL else None)
+            f.write(f"{label} found: {observed}, estimated full run: {round(estimate)} "
+                    f"(95% CI {math.floor(low)}-{math.ceil(high)})\n")
+
+def write_results(target, target_dir, results, output_format='txt', delta=False, partial=None):
+    """Write a target's wordlists and summary, marking them partial when a stage was cut short."""
+    save_outputs(results, target_dir, output_format)
+    
+    with atomic_open(os.path.join(target_dir, "summary.txt")) as f:
+        f.write(f"Target: {target}\n")
+        if partial:
+            f.write(f"Status: partial ({'; '.join(partial)})\n")
+        f.write(f"Parameters found: {len(results['params'])}\n")
+        f.write(f"Directories found: {len(results['directories'])}\n")
+        f.write(f"Subdomains found: {len(results['subdomains'])}\n")
+        f.write(f"Extracted directory paths: {len(results['extracted_dirs'])}\n")
+        f.write(f"API endpoints found: {len(results['api_endpoints'])}\n")
+    
+    # A PARTIAL file lets scripts tell incomplete results apart without parsing the summary
+    partial_marker = os.path.join(target_dir, "PARTIAL")
+    if partial:
+        with atomic_open(partial_marker) as f:
+            f.write('\n'.join(partial) + '\n')
+    elif os.path.exists(partial_marker):
+        os.remove(partial_marker)
+    
+    if delta:
+        index_dir = os.path.join(target_dir, ".index")
+        # Indexes are replaced on leaving the block, after every *_new output is saved
+        with ExitStack() as stack:
+            new_results = {category: stack.enter_context(update_index(results[category], os.path.join(index_dir, f"{category}.idx")))
+                           for category in CATEGORIES}
+            save_outputs(new_results, target_dir, output_format, delta_filename)
+            
+            with atomic_open(os.path.join(target_dir, "summary_new.txt")) as f:
+                f.write(f"Target: {target}\n")
+                if partial:
+                    f.write(f"Status: partial ({'; '.join(partial)})\n")
+                f.write(f"New parameters: {len(new_results['params'])}\n")
+                f.write(f"New directories: {len(new_results['directories'])}\n")
+                f.write(f"New subdomains: {len(new_results['subdomains'])}\n")
+                f.write(f"New extracted directory paths: {len(new_results['extracted_dirs'])}\n")
+                f.write(f"New API endpoints: {len(new_results['api_endpoints'])}\n")
+                f.write(f"New static files: {len(new_results['static_files'])}\n")
+                f.write(f"New fragments: {len(new_results['fragments'])}\n")
+
+def target_steps(target, cookies=None, headers=None, depth=None, timeout=None, 
+                 output_format='txt', proxy=None, scope=None, exclude=None, 
+                 wayback_timeout=None, delta=False, wayback_cache=None, preview=None,
+                 target_budget=None, stage_budget=None, events=None, output_root="output"):
+    """Process a single target, as steps for drive() or drive_async().
+    
+    target_budget bounds the whole target and stage_budget each of its stages, in
+    seconds. A stage that runs out of time stops with what it has, and whatever was
+    extracted before a timeout or an error is still written, marked as partial.
+    With an EventStream in events, findings are also streamed as they turn up.
+    
+    Returns the status of this run: 'complete', 'partial' or 'error'.
+    """
     try:
         if not is_valid_url(target):
             raise ValueError(f"Invalid URL: {target}")
         
-        sanitized_target = sanitize_filename(target)
-        target_dir = os.path.join("output", sanitized_target)
+        target_dir = target_output_dir(target, output_root)
         os.makedirs(target_dir, exist_ok=True)
+    except Exception as e:
+        logging.error(f"Error processing {target}: {str(e)}")
+        print(f"Error processing {target}: {e}")
+        return 'error'
+    
+    deadline = Deadline(target_budget)
+    results = {category: set() for category in CATEGORIES}
+    partial = []
+    
+    def run_stage(name, stage):
+        """Run a stage under its own deadline, noting if it ran out of time or failed.
         
+        A failed stage is recorded and the target goes on with its later stages.
+        """
+        if deadline.expired():
+            partial.append(f"{name} skipped, target budget exhausted")
+            return None
+        stage_deadline = deadline.stage(stage_budget)
+        try:
+            value = yield from stage(stage_deadline)
+        except Exception as e:
+            logging.error(f"{name} failed for {target}: {e}")
+            print(f"{name} failed for {target}: {e}")
+            partial.append(f"{name} failed: {e}")
+            return None
+        if stage_deadline.expired():
+            partial.append(f"{name} stopped at its deadline")
+        return value
+    
+    def stream_url(source, url):
+        """Emit what a URL contains as soon as Katana or waybackurls prints it."""
+        if url and not url.startswith('#'):
+            url_found = {category: set() for category in CATEGORIES}
+            extract_line(url, url_found)
+            events.emit_found(target, url_found, source)
+    
+    try:
         katana_output = os.path.join(target_dir, "katana_output.txt")
         wayback_output = os.path.join(target_dir, "wayback_output.txt")
+        for output_file in (katana_output, wayback_output):
+            discard_unfinished(output_file)
         
-        run_katana(target, katana_output, cookies, headers, depth, timeout, scope, exclude, proxy)
-        run_waybackurls(target, wayback_output, wayback_timeout)
+        katana_problem = yield from run_stage("katana", lambda stage_deadline: katana_steps(
+            target, katana_output, cookies, headers, depth, timeout, scope, exclude, proxy,
+            stage_deadline.remaining(), functools.partial(stream_url, 'katana') if events else None))
+        wayback_problem = yield from run_stage("waybackurls", lambda stage_deadline: waybackurls_steps(
+            target, wayback_output, stage_deadline.stage(wayback_timeout), wayback_cache,
+            functools.partial(stream_url, 'waybackurls') if events else None))
+        partial.extend(problem for problem in (katana_problem, wayback_problem) if problem)
+        # What a tool stopped at its deadline wrote is still extracted, but only finished output is reused
+        katana_output = tool_output(katana_output)
+        wayback_output = tool_output(wayback_output)
+        
+        if preview:
+            yield (run_preview, target, target_dir, katana_output, wayback_output, preview, cookies, headers,
+                   output_format, deadline)
+            print(f"Preview of {target} completed.")
+            return 'partial' if partial else 'complete'
         
         katana_exists = os.path.exists(katana_output) and os.path.getsize(katana_output) > 0
         wayback_exists = os.path.exists(wayback_output) and os.path.getsize(wayback_output) > 0
         
-        params, directories, subdomains, extracted_dirs, api_endpoints = set(), set(), set(), set(), set()
-        wb_params, wb_directories, wb_subdomains, wb_extracted_dirs, wb_api_endpoints = set(), set(), set(), set(), set()
-        
-        if katana_exists:
-            params, directories, subdomains, extracted_dirs, api_endpoints = extract_data(katana_output, target_dir)
-        
-        if wayback_exists:
-            wb_params, wb_directories, wb_subdomains, wb_extracted_dirs, wb_api_endpoints = extract_data(wayback_output, target_dir)
+        for name, output, exists in (("katana", katana_output, katana_exists), ("waybackurls", wayback_output, wayback_exists)):
+            if exists:
+                on_new = (lambda category, value: events.emit(target, category, value, name)) if events else None
+                found = (yield from run_stage(f"{name} extraction", lambda stage_deadline: step(
+                    extract_data, output, stage_deadline, on_new))) or {}
+                for category, data in found.items():
+                    results[category].update(data)
         
-        post_params = set()
         if katana_exists:
-            with open(katana_output, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    try:
-                        url = line.strip()
-                        if url and not url.startswith('#'):
-                            post_params.update(extract_post_params(url, cookies, headers))
-                    except Exception as e:
-                        logging.error(f"Error processing URL for POST params: {line.strip()}, Error: {e}")
-        
-        all_params = params.union(wb_params).union(post_params)
-        all_directories = directories.union(wb_directories)
-        all_subdomains = subdomains.union(wb_subdomains)
-        all_extracted_dirs = extracted_dirs.union(wb_extracted_dirs)
-        all_api_endpoints = api_endpoints.union(wb_api_endpoints)
-        
-        output_files = {
-            'params': {'data': all_params, 'txt': 'params_wordlist.txt', 'json': 'params.json', 'xml': 'params.xml'},
-            'directories': {'data': all_directories, 'txt': 'directories_wordlist.txt', 'json': 'directories.json', 'xml': 'directories.xml'},
-            'subdomains': {'data': all_subdomains, 'txt': 'subdomains_wordlist.txt', 'json': 'subdomains.json', 'xml': 'subdomains.xml'},
-            'extracted_dirs': {'data': all_extracted_dirs, 'txt': 'extracted_directories_wordlist.txt', 'json': 'extracted_dirs.json', 'xml': 'extracted_dirs.xml'},
-            'api_endpoints': {'data': all_api_endpoints, 'txt': 'api_endpoints.txt', 'json': 'api_endpoints.json', 'xml': 'api_endpoints.xml'}
-        }
-        
-        for data_type, file_info in output_files.items():
-            if output_format == 'txt' or output_format == 'all':
-                save_wordlist(file_info['data'], os.path.join(target_dir, file_info['txt']))
-            if output_format == 'json' or output_format == 'all':
-                save_json(file_info['data'], os.path.join(target_dir, file_info['json']))
-            if output_format == 'xml' or output_format == 'all':
-                save_xml(file_info['data'], os.path.join(target_dir, file_info['xml']), data_type)
-        
-        with open(os.path.join(target_dir, "summary.txt"), 'w', encoding='utf-8') as f:
-            f.write(f"Target: {target}\n")
-            f.write(f"Parameters found: {len(all_params)}\n")
-            f.write(f"Directories found: {len(all_directories)}\n")
-            f.write(f"Subdomains found: {len(all_subdomains)}\n")
-            f.write(f"Extracted directory paths: {len(all_extracted_dirs)}\n")
-            f.write(f"API endpoints found: {len(all_api_endpoints)}\n")
-        
-        print(f"Processing {target} completed.")
+            post_cache = os.path.join(target_dir, "post_params_cache.jsonl")
+            on_page = (lambda url, params: events.emit_found(target, {'params': params}, 'post')) if events else None
+            post_params = (yield from run_stage("POST parameters", lambda stage_deadline: step(
+                collect_post_params, read_urls(katana_output), cookies, headers, post_cache, stage_deadline, on_page))) or {}
+            for page_params in post_params.values():
+                results['params'].update(page_params)
     except Exception as e:
         logging.error(f"Error processing {target}: {str(e)}")
         print(f"Error processing {target}: {e}")
+        if preview:
+            return 'error'
+        partial.append(f"error: {e}")
+    
+    try:
+        yield write_results, target, target_dir, results, output_format, delta, partial
+    except Exception as e:
+        logging.error(f"Error writing results for {target}: {str(e)}")
+        print(f"Error writing results for {target}: {e}")
+        return 'error'
+    
+    if partial:
+        print(f"Processing {target} completed with partial results ({'; '.join(partial)}).")
+        return 'partial'
+    print(f"Processing {target} completed.")
+    return 'complete'
+
+def process_target(target, **options):
+    """Process a single target in this thread, with the options of target_steps(), and return its status."""
+    return drive(target_steps(target, **options))
+
+# Pages fetched at once per target by the async engine; --max-inflight caps the total
+ASYNC_FETCHES_PER_TARGET = 64
+
+async def run_command_async(command, timeout=None, on_line=None):
+    """Asyncio counterpart of run_command(), for the async engine."""
+    process = await asyncio.create_subprocess_shell(
+        command, start_new_session=True, limit=1 << 20,
+        stdout=asyncio.subprocess.PIPE if on_line else None)
+    reader = None
+    if on_line:
+        async def read_lines():
+            while True:
+                try:
+                    line = await process.stdout.readline()
+                except ValueError:
+                    continue  # A line longer than the buffer limit is dropped
+                if not line:
+                    break
+                try:
+                    on_line(line.decode('utf-8', errors='ignore').strip())
+                except Exception as e:
+                    logging.error(f"Error handling output line of '{command}': {e}")
+        reader = asyncio.ensure_future(read_lines())
+    try:
+        returncode = await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        # The shell's children (katana, waybackurls) would survive killing only the shell
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+                await asyncio.wait_for(process.wait(), 5)
+                break
+            except ProcessLookupError:
+                break
+            except asyncio.TimeoutError:
+                continue
+        raise subprocess.TimeoutExpired(command, timeout)
+    finally:
+        if reader:
+            await reader
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, command)
+
+async def perform_async(function, *args):
+    """Perform a call yielded by engine-neutral steps on the event loop.
+    
+    Commands run as asyncio subprocesses; anything else blocks, so it runs in a thread.
+    """
+    if function is run_command:
+        return await run_command_async(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args))
+
+async def drive_async(steps, perform=perform_async):
+    """Asyncio counterpart of drive(), awaiting perform for each call the steps yield."""
+    result, error = None, None
+    while True:
+        try:
+            call = steps.send(result) if error is None else steps.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = await perform(*call), None
+        except Exception as e:
+            result, error = None, e
+
+async def fetch_page_async(session, url, headers=None, timeout=10):
+    """Fetch a page on the async engine and return its text, content type and HTTP status."""
+    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        return await response.text(errors='ignore'), response.headers.get('content-type', ''), response.status
+
+async def collect_post_params_async(session, inflight, urls, cookies=None, headers=None, cache_file=None, deadline=None,
+                                    on_page=None, executor=None, concurrency=ASYNC_FETCHES_PER_TARGET):
+    """Asyncio counterpart of collect_post_params(), fetching up to concurrency pages at a time.
+    
+    inflight is a semaphore shared by all targets. A request's timeout only starts
+    once it holds a slot, and pages are parsed in executor after giving it back.
+    """
+    loop = asyncio.get_running_loop()
+    collector = PostParamsCollector(cache_file, cookies, headers, on_page)
+    urls = iter(urls)
+    headers = dict(headers or {})
+    if cookies:
+        headers['Cookie'] = cookies
+    
+    async def fetch_pages():
+        # Every fetcher takes the next URL from the shared iterator
+        for url in urls:
+            try:
+                if collector.cached(url):
+                    continue
+                try:
+                    async with inflight:
+                        if deadline and deadline.expired():
+                            break
+                        text, content_type, status = await fetch_page_async(
+                            session, url, headers, deadline.remaining(10) if deadline else 10)
+                    post_params = await loop.run_in_executor(executor, parse_post_params, url, text, content_type)
+                except Exception as e:
+                    logging.error(f"Error extracting POST params from {url}: {str(e) or type(e).__name__}")
+                    continue
+                collector.fetched(url, post_params, status)
+            except Exception as e:
+                logging.error(f"Error processing URL for POST params: {url}, Error: {e}")
+    
+    try:
+        await asyncio.gather(*(fetch_pages() for _ in range(concurrency)))
+    finally:
+        collector.close()
+    return collector.results
+
+async def process_target_async(target, session, inflight, executor, **options):
+    """Process a single target on the asyncio engine, with the same steps as process_target().
+    
+    Katana, waybackurls and page fetches are awaited on the event loop, with page
+    requests limited by the inflight semaphore shared by all targets. Extraction
+    and writing results go to executor, a process pool, as does page parsing. With
+    --stream, extraction runs in a thread instead so findings are emitted as they
+    turn up. Returns the status of this run like process_target().
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def perform(function, *args):
+        if function is collect_post_params:
+            return await collect_post_params_async(session, inflight, *args, executor=executor)
+        # Callbacks cannot be sent to another process, so streamed extraction stays in a thread
+        if function in (extract_data, write_results) and not any(callable(arg) for arg in args):
+            return await loop.run_in_executor(executor, functools.partial(function, *args))
+        return await perform_async(function, *args)
+    
+    return await drive_async(target_steps(target, **options), perform)
+
+def run_async_engine(targets, target_options, max_targets=5, max_inflight=1000, cpu_workers=None):
+    """Process all targets on one asyncio event loop instead of one thread per target.
+    
+    At most max_targets targets run at once and at most max_inflight page requests
+    are open across all of them. CPU-bound work goes to a pool of cpu_workers
+    processes (one per CPU by default).
+    """
+    # Thousands of sockets and pipes need more than the usual 1024 file descriptors
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = 1 << 20 if hard == resource.RLIM_INFINITY else hard
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    except (ValueError, OSError) as e:
+        logging.error(f"Could not raise the open file limit: {e}")
+    
+    async def run_all():
+        limit = asyncio.Semaphore(max_targets)
+        inflight = asyncio.Semaphore(max_inflight)
+        connector = aiohttp.TCPConnector(limit=max_inflight, ssl=False)
+        
+        async def run_target(target):
+            async with limit:
+                await process_target_async(target, session, inflight, executor, **target_options)
+        
+        # Like requests in the threads engine: proxies come from the environment, and
+        # cookies set by one target's pages are never sent with another's requests
+        async with aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar(),
+                                         trust_env=True) as session:
+            tasks = [asyncio.ensure_future(run_target(target)) for target in targets]
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Processing targets"):
+                await task
+    
+    # Worker processes are started from a clean server process, not forked from this threaded one
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(max_workers=cpu_workers, mp_context=multiprocessing.get_context(start_method)) as executor:
+        asyncio.run(run_all())
+
+class LeaseQueue:
+    """A queue of targets in a shared directory that workers on many nodes take work from.
+    
+    Layout of the queue directory:
+        targets/<id>.json    one file per queued target
+        leases/<id>.lease    held by the worker processing a target, touched as its heartbeat
+        attempts/<id>        one line per claim, to give up on targets that keep failing
+        done/<id>.json       completion record with worker, timings and status
+        failed/<id>.json     targets given up on after max_attempts claims
+    
+    A lease is taken by creating its file exclusively. A lease whose heartbeat is older
+    than lease_ttl belongs to a crashed or stuck worker and is taken over. If two workers
+    still end up on one target, each replaces the output files whole, so they never mix.
+    """
+    
+    def __init__(self, queue_dir, lease_ttl=60, max_attempts=3):
+        self.queue_dir = queue_dir
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.order = []
+        for kind in ('targets', 'leases', 'attempts', 'done', 'failed'):
+            os.makedirs(os.path.join(queue_dir, kind), exist_ok=True)
+    
+    def _path(self, kind, target_id, ext=''):
+        return os.path.join(self.queue_dir, kind, target_id + ext)
+    
+    def _read(self, kind, target_id):
+        with open(self._path(kind, target_id, '.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write(self, kind, target_id, record):
+        with atomic_open(self._path(kind, target_id, '.json')) as f:
+            json.dump(record, f)
+    
+    def ids(self, kind):
+        """Return the ids of the targets in one part of the queue."""
+        ext = '.lease' if kind == 'leases' else '.json'
+        return {name[:-len(ext)] for name in os.listdir(os.path.join(self.queue_dir, kind)) if name.endswith(ext)}
+    
+    def enqueue(self, targets):
+        """Add targets that are not queued yet and return how many were added."""
+        added = 0
+        for target in targets:
+            target_id = hashlib.sha1(target.encode('utf-8')).hexdigest()[:16]
+            if os.path.exists(self._path('targets', target_id, '.json')):
+                continue
+            self._write('targets', target_id, {'target': target, 'queued': time.time()})
+            added += 1
+        return added
+    
+    def targets(self):
+        """Return every queued target."""
+        return [self._read('targets', target_id)['target'] for target_id in sorted(self.ids('targets'))]
+    
+    def settled(self, target_id):
+        """Return True if a target is done or has been given up on."""
+        return (os.path.exists(self._path('done', target_id, '.json'))
+                or os.path.exists(self._path('failed', target_id, '.json')))
+    
+    def finished(self):
+        """Return True once every queued target is done or has been given up on."""
+        return self.ids('targets') <= self.ids('done') | self.ids('failed')
+    
+    def _take_lease(self, target_id, worker):
+        lease = self._path('leases', target_id, '.lease')
+        try:
+            age = time.time() - os.path.getmtime(lease)
+        except FileNotFoundError:
+            age = None
+        if age is not None:
+            if age < self.lease_ttl:
+                return False
+            # The holder stopped heartbeating. Moving its lease aside succeeds for one worker only.
+            expired = f"{lease}.{worker}.expired"
+            try:
+                os.rename(lease, expired)
+            except FileNotFoundError:
+                return False
+            os.remove(expired)
+            logging.error(f"Lease on {target_id} expired, taking it over as {worker}")
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'worker': worker, 'claimed': time.time()}, f)
+        return True
+    
+    def _lease_holder(self, target_id):
+        try:
+            with open(self._path('leases', target_id, '.lease'), 'r', encoding='utf-8') as f:
+                return json.load(f).get('worker')
+        except (OSError, ValueError):
+            return None
+    
+    def claim(self, worker):
+        """Lease the next available target for a worker and return (id, target), or None."""
+        with self.lock:
+            for rescan in (False, True):
+                if rescan or not self.order:
+                    self.order = sorted(self.ids('targets') - self.ids('done') - self.ids('failed'))
+                    # Workers walk the queue in different orders so they rarely race for a lease
+                    random.shuffle(self.order)
+                for target_id in list(self.order):
+                    if self.settled(target_id):
+                        self.order.remove(target_id)
+                        continue
+                    if not self._take_lease(target_id, worker):
+                        continue
+                    self.order.remove(target_id)
+                    if self.settled(target_id):
+                        self.release(target_id, worker)
+                        continue
+                    with open(self._path('attempts', target_id), 'a', encoding='utf-8') as f:
+                        f.write(f"{worker} {time.time()}\n")
+                    with open(self._path('attempts', target_id), 'r', encoding='utf-8') as f:
+                        attempts = sum(1 for _ in f)
+                    target = self._read('targets', target_id)['target']
+                    if attempts > self.max_attempts:
+                        logging.error(f"Giving up on {target} after {self.max_attempts} attempts")
+                        self._write('failed', target_id, {'target': target, 'attempts': attempts - 1})
+                        self.release(target_id, worker)
+                        continue
+                    return target_id, target
+            return None
+    
+    def heartbeat(self, target_id, worker):
+        """Renew a worker's lease, returning False if the lease was lost to another worker."""
+        if self._lease_holder(target_id) != worker:
+            return False
+        try:
+            os.utime(self._path('leases', target_id, '.lease'))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def release(self, target_id, worker):
+        """Drop a worker's lease on a target."""
+        if self._lease_holder(target_id) == worker:
+            try:
+                os.remove(self._path('leases', target_id, '.lease'))
+            except FileNotFoundError:
+                pass
+    
+    def complete(self, target_id, worker, record):
+        """Record a target as done and release its lease."""
+        self._write('done', target_id, record)
+        self.release(target_id, worker)
+    
+    def status(self):
+        """Return the number of targets in each state."""
+        queued = self.ids('targets')
+        done = self.ids('done') & queued
+        failed = self.ids('failed') & queued
+        now = time.time()
+        leased = 0
+        for target_id in self.ids('leases') & (queued - done - failed):
+            try:
+                if now - os.path.getmtime(self._path('leases', target_id, '.lease')) < self.lease_ttl:
+                    leased += 1
+            except FileNotFoundError:
+                continue
+        return {
+            'queued': len(queued),
+            'pending': len(queued) - len(done) - len(failed) - leased,
+            'in_progress': leased,
+            'done': len(done),
+            'failed': len(failed)
+        }
+    
+    def records(self):
+        """Return the completion records of finished targets."""
+        return [self._read('done', target_id) for target_id in sorted(self.ids('done'))]
+
+@contextmanager
+def hold_lease(work_queue, target_id, worker):
+    """Keep renewing a lease in the background while its target is processed."""
+    stop = threading.Event()
+    
+    def beat():
+        while not stop.wait(work_queue.lease_ttl / 3):
+            if not work_queue.heartbeat(target_id, worker):
+                logging.error(f"Worker {worker} lost its lease on {target_id}")
+                return
+    
+    heartbeat = threading.Thread(target=beat, daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+
+def run_worker(work_queue, run_target, threads=1, poll_interval=5):
+    """Process targets from a lease queue until every queued target is settled.
+    
+    run_target processes one target and returns its status, which goes into the
+    target's completion record.
+    """
+    def work(slot):
+        worker = f"{socket.gethostname()}-{os.getpid()}-{slot}"
+        processed = 0
+        while True:
+            claimed = work_queue.claim(worker)
+            if not claimed:
+                if work_queue.finished():
+                    return processed
+                # Remaining targets are leased by other workers; wait for them to finish or expire
+                time.sleep(poll_interval)
+                continue
+            
+            target_id, target = claimed
+            started = time.time()
+            # Status comes from this run; files on disk may be left from an earlier one
+            with hold_lease(work_queue, target_id, worker):
+                try:
+                    status = run_target(target) or 'error'
+                except Exception as e:
+                    logging.error(f"Worker {worker} failed on {target}: {e}")
+                    status = 'error'
+            work_queue.complete(target_id, worker, {
+                'target': target,
+                'worker': worker,
+                'started': started,
+                'finished': time.time(),
+                'status': status
+            })
+            processed += 1
+    
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        processed = sum(executor.map(work, range(threads)))
+    print(f"Worker finished after processing {processed} targets.")
+
+def merge_summaries(work_queue, output_root="output"):
+    """Combine the summaries of all finished targets into the queue's summary.txt."""
+    records = work_queue.records()
+    totals = {}
+    lines = []
+    for record in records:
+        summary_file = os.path.join(target_output_dir(record['target'], output_root), "summary.txt")
+        counts = []
+        if os.path.exists(summary_file):
+            with open(summary_file, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    label, _, value = line.strip().rpartition(': ')
+                    if label and value.isdigit():
+                        totals[label] = totals.get(label, 0) + int(value)
+                        counts.append(value)
+        lines.append(f"{record['target']} [{record['status']}] {' / '.join(counts)}")
+    
+    status = work_queue.status()
+    statuses = [record['status'] for record in records]
+    elapsed = (max(r['finished'] for r in records) - min(r['started'] for r in records)) if records else 0
+    throughput = len(records) / elapsed * 60 if elapsed else 0
+    
+    with atomic_open(os.path.join(work_queue.queue_dir, "summary.txt")) as f:
+        f.write(f"Targets: {status['queued']} ({statuses.count('complete')} complete, "
+                f"{statuses.count('partial')} partial, {statuses.count('error')} errors, {status['failed']} failed)\n")
+        f.write(f"Workers: {len({record['worker'] for record in records})}\n")
+        f.write(f"Throughput: {throughput:.1f} targets/min over {elapsed:.0f}s\n")
+        for label, total in totals.items():
+            f.write(f"{label} (summed over targets): {total}\n")
+        f.write("\nPer target (params / directories / subdomains / extracted paths / API endpoints):\n")
+        f.write('\n'.join(lines) + '\n')
+    print(f"Merged summaries of {len(records)} targets into {os.path.join(work_queue.queue_dir, 'summary.txt')}")
+
+def run_coordinator(work_queue, output_root="output", interval=10):
+    """Report queue progress and throughput until all targets are settled, then merge summaries."""
+    last_time, last_done = time.time(), work_queue.status()['done']
+    while True:
+        status = work_queue.status()
+        now = time.time()
+        rate = (status['done'] - last_done) / (now - last_time) * 60 if now > last_time else 0
+        last_time, last_done = now, status['done']
+        print(f"Queued: {status['queued']}  Pending: {status['pending']}  In progress: {status['in_progress']}  "
+              f"Done: {status['done']}  Failed: {status['failed']}  Throughput: {rate:.1f} targets/min")
+        if work_queue.finished():
+            break
+        time.sleep(interval)
+    merge_summaries(work_queue, output_root)
 
 def show_best_practices():
     """Display best practices for using the tool."""
@@ -356,8 +1883,14 @@ def show_best_practices():
        --update         Update wlmaker-pro to the latest version
 
 {CYAN}Output Options:{END}
-  --format              Output format (txt, json, xml, all)
+  --format              Output format (txt, json, xml, all, none)
+  --stream              Stream findings to stdout as JSONL events
   --threads             Number of parallel targets to process
+  --engine              threads (default) or async (one event loop, needs aiohttp)
+  --max-inflight        Async engine: page requests open at once (default: 1000)
+  --cpu-workers         Async engine: processes for extraction and parsing
+  --preview URLS        Preview from a sample of URLS URLs with estimated full-run counts
+  --delta               Also write *_new outputs with findings new since the last run
 
 {GREEN}Crawling Options:{END}
   --depth              Crawl depth for Katana
@@ -371,8 +1904,17 @@ def show_best_practices():
   --proxy             Proxy for requests
   --disable-ssl-verify Disable SSL verification
 
+{YELLOW}Distributed Runs:{END}
+  --queue DIR          Shared queue directory; given targets are added to it
+  --worker             Process targets from the queue until it is empty
+  --coordinate         Report queue throughput, then merge summaries
+  --output-dir         Directory for per-target results (default: output)
+
 {BLUE}Additional Features:{END}
+  --target-budget      Time budget in seconds per target (partial results are kept)
+  --stage-budget       Time budget in seconds per stage of a target
   --wayback-timeout    Timeout for waybackurls fetching
+  --no-shared-wayback  Fetch archived URLs per target instead of once per apex domain
 
 {MAGENTA}Output Files Generated:{END}
   + params_wordlist.txt          - Extracted parameters
@@ -382,6 +1924,8 @@ def show_best_practices():
   + static_files.txt           - Static file URLs
   + fragments.txt             - URL fragments
   + summary.txt              - Summary of findings
+  + PARTIAL                  - Present when a stage ran out of time or failed
+  + *_new.txt / summary_new.txt - Findings new since the last run (--delta)
   + *.json                  - JSON format outputs
   + *.xml                  - XML format outputs
 
@@ -424,13 +1968,35 @@ def main():
     parser.add_argument('--depth', help='Crawl depth for Katana', type=int)
     parser.add_argument('--timeout', help='Timeout in seconds for Katana', type=int)
     parser.add_argument('--wayback-timeout', help='Timeout in seconds for waybackurls', type=int, default=120)
-    parser.add_argument('--format', choices=['txt', 'json', 'xml', 'all'], default='txt', 
-                        help='Output format: txt (default), json, xml, or all')
+    parser.add_argument('--format', choices=['txt', 'json', 'xml', 'all', 'none'], default='txt', 
+                        help='Output format: txt (default), json, xml, all, or none to write only the summaries (useful with --stream)')
+    parser.add_argument('--stream', help='Stream findings to stdout as JSONL events as soon as they are found', action='store_true')
     parser.add_argument('--proxy', help='Proxy to use for requests (e.g., http://127.0.0.1:8080)')
     parser.add_argument('--scope', choices=['strict', 'fuzzy', 'subdomain'], 
                         help='Scope for crawling: strict, fuzzy, or subdomain')
     parser.add_argument('--exclude', help='Pattern to exclude from crawling')
+    parser.add_argument('--delta', help='Also write *_new outputs with only the findings not seen in previous runs', action='store_true')
+    parser.add_argument('--no-shared-wayback', help='Run waybackurls per target instead of once per apex domain', action='store_true')
+    parser.add_argument('--preview', metavar='URLS', type=int,
+                        help='Quick preview: extract from a stratified sample of at most URLS URLs per target')
+    parser.add_argument('--target-budget', metavar='SECONDS', type=int,
+                        help='Time budget per target; results found so far are written when it runs out')
+    parser.add_argument('--stage-budget', metavar='SECONDS', type=int,
+                        help='Time budget per stage of a target (crawl, archive fetch, extraction, POST fetching)')
     parser.add_argument('--threads', help='Number of parallel targets to process', type=int, default=5)
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help='threads (default): one thread per target; async: all targets on one asyncio event loop (needs aiohttp)')
+    parser.add_argument('--max-inflight', metavar='REQUESTS', type=int, default=1000,
+                        help='Async engine: page requests open at once across all targets (default: 1000)')
+    parser.add_argument('--cpu-workers', metavar='PROCESSES', type=int,
+                        help='Async engine: processes for extraction and page parsing (default: one per CPU)')
+    parser.add_argument('--output-dir', help='Directory for per-target results (default: output)', default='output')
+    parser.add_argument('--queue', metavar='DIR', help='Shared queue directory for distributed runs; given targets are added to it')
+    parser.add_argument('--worker', help='Process targets from the --queue directory until it is empty', action='store_true')
+    parser.add_argument('--coordinate', help='Report --queue progress until all targets are done, then merge summaries', action='store_true')
+    parser.add_argument('--lease-ttl', metavar='SECONDS', type=int, default=60,
+                        help='Seconds without a heartbeat after which a queued target is retried (default: 60)')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Attempts per queued target before giving up (default: 3)')
     parser.add_argument('--disable-ssl-verify', help='Disable SSL certificate verification', action='store_true')
     parser.add_argument('--update', help='Update the tool to the latest version', action='store_true')
     parser.add_argument('--version', '-v', action='version', version='wlmaker-pro v0.2')
@@ -446,13 +2012,19 @@ def main():
         return
 
     # Show best practices if no arguments provided
-    if not args.url and not args.url_opt and not args.file:
+    if not args.url and not args.url_opt and not args.file and not args.queue:
         show_best_practices()
         return
 
     # Process arguments
-    if not args.url and not args.url_opt and not args.file:
+    if not args.url and not args.url_opt and not args.file and not args.queue:
         parser.error("Please provide a URL or a file with URLs")
+    if (args.worker or args.coordinate) and not args.queue:
+        parser.error("--worker and --coordinate need a --queue directory")
+    if args.engine == 'async' and aiohttp is None:
+        parser.error("--engine async needs aiohttp: pip install aiohttp")
+    if args.engine == 'async' and args.worker:
+        parser.error("--worker runs on the threads engine; drop --engine async")
 
     cookies = args.cookies
     headers = {}
@@ -477,33 +2049,76 @@ def main():
         # Disable SSL warnings
         requests.packages.urllib3.disable_warnings()
 
+    targets = []
     if args.file:
         with open(args.file, 'r') as f:
             targets = [line.strip() for line in f if line.strip()]
-    else:
+    elif args.url or args.url_opt:
         # Use either the positional url argument or the -u/--url argument
         target_url = args.url or args.url_opt
         if not target_url.startswith(('http://', 'https://')):
             target_url = 'https://' + target_url
         targets = [target_url]
 
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        futures = [executor.submit(
-            process_target, 
-            target, 
-            cookies, 
-            headers, 
-            depth, 
-            timeout, 
-            output_format,
-            proxy,
-            scope,
-            exclude,
-            wayback_timeout
-        ) for target in targets]
-        
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing targets"):
-            future.result()
+    work_queue = None
+    if args.queue:
+        work_queue = LeaseQueue(args.queue, args.lease_ttl, args.max_attempts)
+        if targets:
+            print(f"Added {work_queue.enqueue(targets)} new targets to {args.queue}.")
+        if args.coordinate:
+            run_coordinator(work_queue, args.output_dir)
+            return
+        if not args.worker:
+            return
+        targets = work_queue.targets()
+
+    # Keep subdomains of the same apex together so they share one archive fetch
+    targets = [target for group in group_targets_by_apex(targets).values() for target in group]
+    wayback_cache = None if args.no_shared_wayback else WaybackCache(targets, args.output_dir)
+
+    events = None
+    if args.stream:
+        # stdout carries only events from here on; progress messages go to stderr
+        events = EventStream(sys.stdout)
+        sys.stdout = sys.stderr
+
+    target_options = dict(
+        cookies=cookies,
+        headers=headers,
+        depth=depth,
+        timeout=timeout,
+        output_format=output_format,
+        proxy=proxy,
+        scope=scope,
+        exclude=exclude,
+        wayback_timeout=wayback_timeout,
+        delta=args.delta,
+        wayback_cache=wayback_cache,
+        preview=args.preview,
+        target_budget=args.target_budget,
+        stage_budget=args.stage_budget,
+        events=events,
+        output_root=args.output_dir
+    )
+    run_target = functools.partial(process_target, **target_options)
+
+    try:
+        if work_queue:
+            run_worker(work_queue, run_target, threads)
+        elif args.engine == 'async':
+            run_async_engine(targets, target_options, threads, args.max_inflight, args.cpu_workers)
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                futures = [executor.submit(run_target, target) for target in targets]
+                
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Processing targets"):
+                    future.result()
+    finally:
+        if wayback_cache:
+            wayback_cache.close()
+        if events:
+            events.close()
+            sys.stdout = events.stream
 
 if __name__ == "__main__":
     main()